@@ -93,6 +93,46 @@ export interface DailyMetric {
   totalClicks: number;
 }
 
+export type RollupResolution = 'daily' | 'weekly' | 'monthly' | 'yearly';
+
+/** Prebuilt rollup row; engagementRateSum/Count allow exact re-merging. */
+export interface RollupMetric {
+  period: string;
+  startDate: string;
+  postCount: number;
+  totalReach: number;
+  totalEngagement: number;
+  avgEngagementRate: number;
+  totalShares: number;
+  totalClicks: number;
+  engagementRateSum: number;
+  engagementRateCount: number;
+}
+
+export type TimeRollups = Record<RollupResolution, RollupMetric[]>;
+
+// ============================================================================
+// Post Growth Time Series
+// ============================================================================
+
+/** One post's growth curve; every array is delta-encoded (first value absolute). */
+export interface PostTimeSeries {
+  id: string;
+  start: string;
+  days: number[];
+  reach: number[];
+  likes: number[];
+  shares: number[];
+  comments: number[];
+  clicks: number[];
+}
+
+export interface PostTimeSeriesIndex {
+  metrics: string[];
+  encoding: 'delta';
+  months: { month: string; postCount: number; file: string }[];
+}
+
 // ============================================================================
 // Stats / Aggregates (existing)
 // ============================================================================
@@ -156,6 +196,10 @@ export interface TrendingPost {
   reach: number;
   engagementPerHour: number;
   engagementRate: number;
+  engagementDelta?: number;
+  reachDelta?: number;
+  reachPerHour?: number;
+  velocitySource?: 'crawlDelta' | 'sincePublish';
 }
 
 export interface BestCombo {
@@ -201,27 +245,37 @@ export interface Campaign {
   campaignId: string;
   name: string;
   objective: string;
+  topic: string;
   status: string;
   totalSpend: number;
-  impressions: number;
+  reach: number;
+  engagement: number;
   clicks: number;
-  cpm: number;
-  cpc: number;
-  ctr: number;
-  startTime?: string;
-  endTime?: string;
+  costPerEngagement: number | null;
+  costPerClick: number | null;
+  costPer1kReach: number | null;
+  ctr: number | null;
+  startTime: string | null;
 }
 
+export type ROIDimension = 'actionType' | 'topic' | 'month';
+
 export interface ROIByType {
-  actionType: string;
-  topic: string;
+  dimension: ROIDimension;
+  key: string;
   adCount: number;
+  organicCount: number;
   totalSpend: number;
-  impressions: number;
+  reach: number;
+  engagement: number;
   clicks: number;
-  avgCPM: number;
-  avgCPC: number;
-  avgCTR: number;
+  costPerEngagement: number | null;
+  costPerClick: number | null;
+  costPer1kReach: number | null;
+  paidAvgER: number;
+  organicAvgER: number;
+  erLift: number | null;
+  reachLift: number | null;
 }
 
 export interface AdAnalyticsData {
@@ -75,10 +75,12 @@ export const PERFORMANCE_TIERS = {
 export const DATA_PATHS = {
   posts: '/data/posts.json',
   daily: '/data/daily.json',
+  rollups: '/data/rollups.json',
   stats: '/data/stats.json',
   adAnalytics: '/data/ad-analytics.json',
   contentAnalysis: '/data/content-analysis.json',
   postsPerformance: '/data/posts-performance.json',
+  postTimeSeries: '/data/post-timeseries/',
 };
 
 // Firestore collection names
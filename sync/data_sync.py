@@ -4,6 +4,7 @@ GCAA 社群分析 - 資料同步腳本
 從 Google Sheets 讀取 raw_posts + raw_post_insights，生成 JSON 檔案供前端使用
 """
 
+import heapq
 import json
 import os
 from datetime import datetime, timedelta
@@ -15,6 +16,7 @@ from googleapiclient.discovery import build
 SPREADSHEET_ID = '1HJXQrlB0eYJsHmioLMNfCKV_OXHqqgwtwRtO9s5qbB0'
 SERVICE_ACCOUNT_FILE = os.path.join(os.path.dirname(__file__), '..', 'esg-reports-collection-9661012923ed.json')
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), '..', 'public', 'data')
+TIMESERIES_DIR = os.path.join(OUTPUT_DIR, 'post-timeseries')
 
 # Sheets 設定
 SHEETS = {
@@ -24,6 +26,18 @@ SHEETS = {
     'ad_analytics': '💰 ad_analytics'
 }
 
+# 熱門貼文 (由快照計算): 取前幾名 / 只看最近幾天發布的貼文
+TRENDING_LIMIT = 20
+TRENDING_WINDOW_DAYS = 7
+# 速度計算的最短間隔 (小時)，避免剛發布或只有日期的快照算出誇大的每小時速度
+MIN_VELOCITY_HOURS = 6
+
+# 成長曲線輸出的指標 (依序)
+TIMESERIES_METRICS = ['reach', 'likes', 'shares', 'comments', 'clicks']
+
+# 趨勢圖預先聚合的時間粒度
+ROLLUP_RESOLUTIONS = ['daily', 'weekly', 'monthly', 'yearly']
+
 def get_sheets_service():
     """建立 Google Sheets API 連線"""
     credentials = service_account.Credentials.from_service_account_file(
@@ -170,43 +184,256 @@ def process_insights_data(raw_insights):
 
     return posts
 
-def generate_daily_data(posts):
-    """生成每日聚合資料"""
-    daily_map = defaultdict(lambda: {
+def parse_crawl_time(row):
+    """解析快照抓取時間: data_updated_at 落在抓取日期當天時使用，否則退回抓取日期 (00:00)"""
+    crawl_date = parse_datetime(row.get('抓取日期', ''))
+    if not crawl_date:
+        return None
+    updated_at = parse_datetime(row.get('data_updated_at', ''))
+    if updated_at and updated_at.date() == crawl_date.date():
+        return updated_at
+    return crawl_date
+
+def latest_snapshot_rows(raw_insights):
+    """每個 Post ID 只保留抓取時間最新的一列 (raw_post_insights 每日快照各佔一列)"""
+    latest = {}
+    for row in raw_insights:
+        post_id = row.get('Post ID', '')
+        if not post_id:
+            continue
+        crawled_at = parse_crawl_time(row) or datetime.min
+        if post_id not in latest or crawled_at >= latest[post_id][0]:
+            latest[post_id] = (crawled_at, row)
+
+    return [row for _, row in latest.values()]
+
+def group_snapshots_by_post(raw_insights):
+    """將 raw_post_insights 的每日快照依 Post ID 分組 (依抓取時間排序，同日保留抓取時間最晚的一筆)"""
+    groups = {}
+    for row in raw_insights:
+        post_id = row.get('Post ID', '')
+        crawled_at = parse_crawl_time(row)
+        if not post_id or not crawled_at:
+            continue
+
+        group = groups.get(post_id)
+        if group is None:
+            group = groups[post_id] = {
+                'publishedAt': parse_datetime(row.get('發布時間 (GMT+8)', '')),
+                'content': row.get('內容預覽', '') or '',
+                'snapshots': {}
+            }
+
+        # 同一天有多筆時保留抓取時間較晚的一筆 (與 latest_snapshot_rows 一致)
+        existing = group['snapshots'].get(crawled_at.date())
+        if existing and crawled_at < existing['crawledAt']:
+            continue
+
+        likes = parse_int(row.get('總讚數', 0))
+        comments = parse_int(row.get('留言數', 0))
+        shares = parse_int(row.get('分享數', 0))
+        group['snapshots'][crawled_at.date()] = {
+            'crawledAt': crawled_at,
+            'reach': parse_int(row.get('觸及人數', 0)),
+            'likes': likes,
+            'comments': comments,
+            'shares': shares,
+            'clicks': parse_int(row.get('點擊數', 0)),
+            'engagement': likes + comments + shares
+        }
+
+    for group in groups.values():
+        group['snapshots'] = [group['snapshots'][k] for k in sorted(group['snapshots'])]
+
+    return groups
+
+def compute_post_velocity(snapshot_groups, now=None):
+    """計算每篇貼文最近兩次抓取之間的互動/觸及增量與每小時速度
+
+    只有一筆快照的貼文改以「發布到抓取之間的累積值」估算，並標記 velocitySource 為
+    'sincePublish' (兩次抓取之間則為 'crawlDelta')；兩者不可直接比較。
+    """
+    now = now or datetime.now()
+    velocities = []
+    for post_id, group in snapshot_groups.items():
+        snapshots = group['snapshots']
+        published_at = group['publishedAt']
+        if not snapshots:
+            continue
+
+        latest = snapshots[-1]
+        if len(snapshots) >= 2:
+            # 兩次抓取之間的增量
+            previous = snapshots[-2]
+            engagement_delta = latest['engagement'] - previous['engagement']
+            reach_delta = latest['reach'] - previous['reach']
+            hours = (latest['crawledAt'] - previous['crawledAt']).total_seconds() / 3600
+            velocity_source = 'crawlDelta'
+        elif published_at and latest['crawledAt'].date() >= published_at.date():
+            # 只有一筆快照: 以發布到抓取之間的累積值估算
+            # (抓取時間可能只有日期，當天發布的貼文會得到負值，因此下方一律套用最短間隔)
+            engagement_delta = latest['engagement']
+            reach_delta = latest['reach']
+            hours = (latest['crawledAt'] - published_at).total_seconds() / 3600
+            velocity_source = 'sincePublish'
+        else:
+            continue
+
+        hours = max(hours, MIN_VELOCITY_HOURS)
+
+        hours_since_post = (now - published_at).total_seconds() / 3600 if published_at else 0
+        velocities.append({
+            'postId': post_id,
+            'messagePreview': group['content'][:50],
+            'createdTime': published_at.isoformat(timespec='minutes') if published_at else '',
+            'hoursSincePost': max(int(hours_since_post), 0),
+            'currentEngagement': latest['engagement'],
+            'reach': latest['reach'],
+            'engagementDelta': engagement_delta,
+            'reachDelta': reach_delta,
+            'engagementPerHour': round(engagement_delta / hours, 2),
+            'reachPerHour': round(reach_delta / hours, 2),
+            'velocitySource': velocity_source,
+            'engagementRate': round(latest['engagement'] / latest['reach'] * 100, 2) if latest['reach'] > 0 else 0
+        })
+
+    return velocities
+
+def rank_trending_posts(velocities, limit=TRENDING_LIMIT, window_days=TRENDING_WINDOW_DAYS):
+    """依兩次抓取之間的每小時互動速度取近期前 N 名熱門貼文 (bounded heap, 不做全排序)
+
+    只有一筆快照 (velocitySource 為 'sincePublish') 的貼文速度定義不同，不列入排名。
+    """
+    max_hours = window_days * 24
+    return heapq.nlargest(
+        limit,
+        (
+            v for v in velocities
+            if v['velocitySource'] == 'crawlDelta' and v['createdTime'] and v['hoursSincePost'] <= max_hours
+        ),
+        key=lambda v: (v['engagementPerHour'], v['reachPerHour'])
+    )
+
+def delta_encode(values):
+    """差分編碼: 第一個值保留原值，其後為與前一個值的差"""
+    encoded = []
+    previous = 0
+    for value in values:
+        encoded.append(value - previous)
+        previous = value
+    return encoded
+
+def generate_post_timeseries(snapshot_groups):
+    """生成每篇貼文的成長曲線 (差分編碼)，依發布月份分組"""
+    by_month = defaultdict(list)
+    for post_id, group in snapshot_groups.items():
+        snapshots = group['snapshots']
+        if not snapshots:
+            continue
+
+        start = snapshots[0]['crawledAt'].date()
+        month = (group['publishedAt'] or snapshots[0]['crawledAt']).strftime('%Y-%m')
+        entry = {
+            'id': post_id,
+            'start': start.isoformat(),
+            # 距 start 的天數，同樣差分編碼 (連續每日抓取時為 [0, 1, 1, ...])
+            'days': delta_encode([(s['crawledAt'].date() - start).days for s in snapshots])
+        }
+        for metric in TIMESERIES_METRICS:
+            entry[metric] = delta_encode([s[metric] for s in snapshots])
+        by_month[month].append(entry)
+
+    return {month: sorted(entries, key=lambda x: x['id']) for month, entries in sorted(by_month.items())}
+
+def rollup_period(dt, resolution):
+    """回傳 (期間標籤, 期間起始日)，週使用 ISO 週 (週一起算)"""
+    date = dt.date()
+    if resolution == 'daily':
+        return date.isoformat(), date
+    if resolution == 'weekly':
+        iso_year, iso_week, _ = date.isocalendar()
+        return f'{iso_year}-W{iso_week:02d}', date - timedelta(days=date.weekday())
+    if resolution == 'monthly':
+        return date.strftime('%Y-%m'), date.replace(day=1)
+    if resolution == 'yearly':
+        return str(date.year), date.replace(month=1, day=1)
+    raise ValueError(f'Unknown rollup resolution: {resolution}')
+
+def new_rollup_bucket():
+    """可合併的聚合累加器 (只存總和與計數，平均值於輸出時計算)"""
+    return {
         'postCount': 0,
         'totalReach': 0,
         'totalEngagement': 0,
         'totalShares': 0,
         'totalClicks': 0,
-        'engagementRates': []
-    })
+        'engagementRateSum': 0.0,
+        'engagementRateCount': 0
+    }
+
+def add_to_rollup_bucket(bucket, post):
+    """將一篇貼文累加進聚合累加器"""
+    bucket['postCount'] += 1
+    bucket['totalReach'] += post['metrics']['reach']
+    bucket['totalEngagement'] += post['computed']['totalEngagement']
+    bucket['totalShares'] += post['metrics']['shares']
+    bucket['totalClicks'] += post['metrics']['clicks']
+    if post['computed']['engagementRate'] > 0:
+        bucket['engagementRateSum'] += post['computed']['engagementRate']
+        bucket['engagementRateCount'] += 1
+
+def generate_time_rollups(posts, resolutions=ROLLUP_RESOLUTIONS):
+    """一次掃描生成日 / ISO 週 / 月 / 年聚合資料 (新到舊)"""
+    buckets = {resolution: {} for resolution in resolutions}
 
     for post in posts:
         if not post['publishedAt']:
             continue
+        try:
+            dt = datetime.fromisoformat(post['publishedAt'])
+        except (ValueError, TypeError):
+            continue
 
-        date = post['publishedAt'][:10]  # YYYY-MM-DD
-        daily = daily_map[date]
+        for resolution in resolutions:
+            period, start = rollup_period(dt, resolution)
+            if period not in buckets[resolution]:
+                buckets[resolution][period] = (start, new_rollup_bucket())
+            add_to_rollup_bucket(buckets[resolution][period][1], post)
+
+    rollups = {}
+    for resolution in resolutions:
+        rows = []
+        for period, (start, data) in sorted(buckets[resolution].items(), key=lambda x: x[1][0], reverse=True):
+            er_count = data['engagementRateCount']
+            avg_er = data['engagementRateSum'] / er_count if er_count else 0
+            rows.append({
+                'period': period,
+                'startDate': start.isoformat(),
+                'postCount': data['postCount'],
+                'totalReach': data['totalReach'],
+                'totalEngagement': data['totalEngagement'],
+                'avgEngagementRate': round(avg_er, 2),
+                'totalShares': data['totalShares'],
+                'totalClicks': data['totalClicks'],
+                'engagementRateSum': data['engagementRateSum'],
+                'engagementRateCount': er_count
+            })
+        rollups[resolution] = rows
 
-        daily['postCount'] += 1
-        daily['totalReach'] += post['metrics']['reach']
-        daily['totalEngagement'] += post['computed']['totalEngagement']
-        daily['totalShares'] += post['metrics']['shares']
-        daily['totalClicks'] += post['metrics']['clicks']
-        if post['computed']['engagementRate'] > 0:
-            daily['engagementRates'].append(post['computed']['engagementRate'])
+    return rollups
 
+def generate_daily_data(daily_rollups):
+    """由日聚合 (generate_time_rollups 的 daily) 生成每日資料"""
     daily_data = []
-    for date, data in sorted(daily_map.items(), reverse=True):
-        avg_er = sum(data['engagementRates']) / len(data['engagementRates']) if data['engagementRates'] else 0
+    for row in daily_rollups:
         daily_data.append({
-            'date': date,
-            'postCount': data['postCount'],
-            'totalReach': data['totalReach'],
-            'totalEngagement': data['totalEngagement'],
-            'avgEngagementRate': round(avg_er, 2),
-            'totalShares': data['totalShares'],
-            'totalClicks': data['totalClicks']
+            'date': row['period'],
+            'postCount': row['postCount'],
+            'totalReach': row['totalReach'],
+            'totalEngagement': row['totalEngagement'],
+            'avgEngagementRate': row['avgEngagementRate'],
+            'totalShares': row['totalShares'],
+            'totalClicks': row['totalClicks']
         })
 
     return daily_data
@@ -329,6 +556,108 @@ def generate_stats(posts):
     }
 
 
+def safe_ratio(numerator, denominator, scale=1, digits=2):
+    """安全除法 (分母為 0 時: 分子也為 0 回傳 0，分子為正則無從計算，回傳 None)"""
+    if denominator > 0:
+        return round(numerator / denominator * scale, digits)
+    return None if numerator > 0 else 0
+
+def generate_roi_analytics(posts):
+    """由每篇貼文的廣告花費計算投廣效益 (依行動類型 / 議題 / 月份) 與各投廣貼文明細
+
+    posts 需為每個 Post ID 一筆 (最新快照)，否則花費會重複計算。
+    """
+    def new_group():
+        return {
+            'paid': {'count': 0, 'spend': 0.0, 'reach': 0, 'engagement': 0, 'clicks': 0, 'totalER': 0.0, 'erCount': 0},
+            'organic': {'count': 0, 'spend': 0.0, 'reach': 0, 'engagement': 0, 'clicks': 0, 'totalER': 0.0, 'erCount': 0}
+        }
+
+    dimensions = ['actionType', 'topic', 'month']
+    by_dimension = {dimension: defaultdict(new_group) for dimension in dimensions}
+    campaigns = []
+
+    for post in posts:
+        is_paid = post['isPromoted'] or post['adSpend'] > 0
+        spend = post['adSpend']
+        reach = post['metrics']['reach']
+        engagement = post['computed']['totalEngagement']
+        clicks = post['metrics']['clicks']
+
+        keys = {
+            'actionType': post['actionType'],
+            'topic': post['topic'],
+            'month': post['publishedAt'][:7] if post['publishedAt'] else ''
+        }
+        for dimension, key in keys.items():
+            if not key:
+                continue
+            acc = by_dimension[dimension][key]['paid' if is_paid else 'organic']
+            acc['count'] += 1
+            acc['spend'] += spend
+            acc['reach'] += reach
+            acc['engagement'] += engagement
+            acc['clicks'] += clicks
+            # 與每日 / 時間聚合一致，平均互動率只計入有觸及資料 (互動率 > 0) 的貼文
+            if post['computed']['engagementRate'] > 0:
+                acc['totalER'] += post['computed']['engagementRate']
+                acc['erCount'] += 1
+
+        if is_paid:
+            campaigns.append({
+                'campaignId': post['id'],
+                'name': post['contentPreview'],
+                'objective': post['actionType'],
+                'topic': post['topic'],
+                'status': post['adStatus'],
+                'totalSpend': round(spend, 2),
+                'reach': reach,
+                'engagement': engagement,
+                'clicks': clicks,
+                'costPerEngagement': safe_ratio(spend, engagement),
+                'costPerClick': safe_ratio(spend, clicks),
+                'costPer1kReach': safe_ratio(spend, reach, scale=1000),
+                'ctr': safe_ratio(clicks, reach, scale=100),
+                'startTime': post['publishedAt']
+            })
+
+    roi_by_type = []
+    for dimension in dimensions:
+        groups = by_dimension[dimension]
+        for key, data in sorted(groups.items(), key=lambda x: -x[1]['paid']['spend']):
+            paid, organic = data['paid'], data['organic']
+            if paid['count'] == 0:
+                continue
+            paid_avg_er = paid['totalER'] / paid['erCount'] if paid['erCount'] else 0
+            organic_avg_er = organic['totalER'] / organic['erCount'] if organic['erCount'] else 0
+            paid_avg_reach = paid['reach'] / paid['count']
+            organic_avg_reach = organic['reach'] / organic['count'] if organic['count'] else 0
+            roi_by_type.append({
+                'dimension': dimension,
+                'key': key,
+                'adCount': paid['count'],
+                'organicCount': organic['count'],
+                'totalSpend': round(paid['spend'], 2),
+                'reach': paid['reach'],
+                'engagement': paid['engagement'],
+                'clicks': paid['clicks'],
+                'costPerEngagement': safe_ratio(paid['spend'], paid['engagement']),
+                'costPerClick': safe_ratio(paid['spend'], paid['clicks']),
+                'costPer1kReach': safe_ratio(paid['spend'], paid['reach'], scale=1000),
+                'paidAvgER': round(paid_avg_er, 2),
+                'organicAvgER': round(organic_avg_er, 2),
+                # 付費相對自然的提升 (%)，自然貼文平均為 0 (或沒有自然貼文) 時無從比較，為 None
+                'erLift': safe_ratio(paid_avg_er - organic_avg_er, organic_avg_er, scale=100) if organic_avg_er > 0 else None,
+                'reachLift': safe_ratio(paid_avg_reach - organic_avg_reach, organic_avg_reach, scale=100) if organic_avg_reach > 0 else None
+            })
+
+    campaigns.sort(key=lambda x: -x['totalSpend'])
+
+    return {
+        'roiByType': roi_by_type,
+        'campaigns': campaigns
+    }
+
 def parse_section_data(rows, section_marker):
     """
     Parse a section from the sheet data.
@@ -634,19 +963,31 @@ def main():
     raw_insights = fetch_sheet_data(service, SHEETS['raw_insights'])
     print(f'  - {len(raw_insights)} 筆貼文')
 
-    # 處理資料
+    # 處理資料 (每篇貼文只取最新快照，posts.json / stats / 每日資料都以每篇一筆計算)
     print('\n處理資料...')
-    posts = process_insights_data(raw_insights)
-    print(f'  - 處理後: {len(posts)} 筆貼文')
+    posts = process_insights_data(latest_snapshot_rows(raw_insights))
+    print(f'  - 處理後: {len(posts)} 篇貼文 (最新快照)')
 
     # 生成聚合資料
-    daily = generate_daily_data(posts)
+    rollups = generate_time_rollups(posts)
+    daily = generate_daily_data(rollups['daily'])
     print(f'  - 每日資料: {len(daily)} 天')
+    print(f'  - 時間聚合: {len(rollups["weekly"])} 週, {len(rollups["monthly"])} 月, {len(rollups["yearly"])} 年')
 
     stats = generate_stats(posts)
     print(f'  - 行動類型: {len(stats["byActionType"])} 種')
     print(f'  - 議題: {len(stats["byTopic"])} 種')
 
+    snapshot_groups = group_snapshots_by_post(raw_insights)
+    trending_posts = rank_trending_posts(compute_post_velocity(snapshot_groups))
+    print(f'  - 快照貼文: {len(snapshot_groups)} 篇, 熱門貼文: {len(trending_posts)} 筆')
+
+    post_timeseries = generate_post_timeseries(snapshot_groups)
+    print(f'  - 成長曲線: {len(post_timeseries)} 個月份')
+
+    roi = generate_roi_analytics(posts)
+    print(f'  - 投廣效益: {len(roi["roiByType"])} 組, 投廣貼文: {len(roi["campaigns"])} 篇')
+
     # ===== 2. 讀取 content_analysis =====
     print('\n讀取 content_analysis...')
     try:
@@ -696,6 +1037,13 @@ def main():
             'organicVsPaid': [], 'campaigns': [], 'roiByType': []
         }
 
+    # 熱門貼文一律改由快照直接計算 (即使近期沒有貼文也不使用試算表公式分頁)
+    ad_analytics['trendingPosts'] = trending_posts
+
+    # 投廣效益與投廣貼文明細同樣由貼文資料直接計算
+    ad_analytics['roiByType'] = roi['roiByType']
+    ad_analytics['campaigns'] = roi['campaigns']
+
     # ===== 寫入 JSON 檔案 =====
     print('\n寫入 JSON 檔案...')
 
@@ -711,6 +1059,12 @@ def main():
         json.dump(daily, f, ensure_ascii=False, indent=2)
     print(f'  - {daily_file}')
 
+    # 2b. rollups.json (日 / 週 / 月 / 年，趨勢圖依範圍選擇粒度)
+    rollups_file = os.path.join(OUTPUT_DIR, 'rollups.json')
+    with open(rollups_file, 'w', encoding='utf-8') as f:
+        json.dump(rollups, f, ensure_ascii=False, indent=2)
+    print(f'  - {rollups_file}')
+
     # 3. stats.json
     stats_file = os.path.join(OUTPUT_DIR, 'stats.json')
     with open(stats_file, 'w', encoding='utf-8') as f:
@@ -735,6 +1089,31 @@ def main():
         json.dump(ad_analytics, f, ensure_ascii=False, indent=2)
     print(f'  - {ads_file}')
 
+    # 7. post-timeseries/ (依發布月份分檔，前端只載入需要的月份)
+    os.makedirs(TIMESERIES_DIR, exist_ok=True)
+    # 先清除舊的月份檔，避免已不在資料中的月份殘留
+    for name in os.listdir(TIMESERIES_DIR):
+        if name.endswith('.json') and name != 'index.json':
+            os.remove(os.path.join(TIMESERIES_DIR, name))
+    timeseries_index = {
+        'metrics': TIMESERIES_METRICS,
+        'encoding': 'delta',
+        'months': []
+    }
+    for month, entries in post_timeseries.items():
+        month_file = os.path.join(TIMESERIES_DIR, f'{month}.json')
+        with open(month_file, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False, separators=(',', ':'))
+        timeseries_index['months'].append({
+            'month': month,
+            'postCount': len(entries),
+            'file': f'{month}.json'
+        })
+    index_file = os.path.join(TIMESERIES_DIR, 'index.json')
+    with open(index_file, 'w', encoding='utf-8') as f:
+        json.dump(timeseries_index, f, ensure_ascii=False, indent=2)
+    print(f'  - {index_file} ({len(post_timeseries)} 個月份)')
+
     print('\n同步完成!')
     print(f'資料更新時間: {stats["lastUpdated"]}')
 